@@ -12,17 +12,72 @@ import subprocess
 import argparse
 import logging
 import hashlib
+import mmap
 import difflib
-import re
-from PyPDF2 import PdfReader
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from pypdf import PdfReader
 from pdf2image import convert_from_path
 from PIL import Image
 import numpy as np
 
+try:
+    import pyvips
+except (ImportError, OSError):
+    pyvips = None
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 logger = logging.getLogger(__name__)
 
+# Worker processes for per-page work; gains flatten out beyond a handful
+MAX_WORKERS = min(os.cpu_count() or 1, 6)
+
+# PDF readers opened by each worker process, keyed by path
+_worker_readers = {}
+
+# Width of the page thumbnails hashed before the full visual comparison
+THUMBNAIL_SIZE = 64
+
+# Compiled PDFs are cached here, keyed by a fingerprint of the project sources
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "latex-paper-cleaner")
+
+# Files written by a LaTeX run; every other file in a project may affect the
+# compiled PDF. A .bbl is kept as a source since projects often ship one
+BUILD_EXTENSIONS = (
+    ".aux",
+    ".log",
+    ".out",
+    ".toc",
+    ".lof",
+    ".lot",
+    ".blg",
+    ".bcf",
+    ".run.xml",
+    ".fls",
+    ".fdb_latexmk",
+    ".synctex.gz",
+    ".nav",
+    ".snm",
+    ".vrb",
+    ".idx",
+    ".ind",
+    ".ilg",
+    ".glo",
+    ".gls",
+    ".glg",
+    ".nlo",
+    ".nls",
+    ".xdv",
+    ".dvi",
+)
+
+# Directories never hashed: version control metadata, and the output of
+# packages such as minted that write into the project (matched as prefixes)
+IGNORED_DIR_PREFIXES = (".git", ".svn", ".hg", "_minted")
+
 
 def compile_latex(project_dir, main_tex):
     """
@@ -36,27 +91,22 @@ def compile_latex(project_dir, main_tex):
         Path to the generated PDF file, or None if compilation failed
     """
     try:
-        # Ensure we're in the project directory
-        original_dir = os.getcwd()
-        os.chdir(project_dir)
-
-        # Get the base path and filename of main_tex
-        tex_dir = os.path.dirname(main_tex)
-        if tex_dir:
-            os.chdir(tex_dir)
-            main_tex_file = os.path.basename(main_tex)
-        else:
-            main_tex_file = main_tex
+        # Run everything from the directory of main_tex without touching the
+        # process-wide working directory
+        run_dir = os.path.join(project_dir, os.path.dirname(main_tex))
+        main_tex_file = os.path.basename(main_tex)
 
         # Remove potential .tex extension to get PDF name
         pdf_name = os.path.splitext(main_tex_file)[0] + ".pdf"
 
-        # Try to compile using latexmk (more reliable)
-        logger.info(f"Compiling {main_tex_file} in {os.getcwd()}")
+        # Try to compile using latexmk (more reliable); only the exit code
+        # matters, so let the kernel discard its output
+        logger.info(f"Compiling {main_tex_file} in {os.path.abspath(run_dir)}")
         result = subprocess.run(
             ["latexmk", "-pdf", main_tex_file, "--shell-escape"],
-            capture_output=True,
-            text=True,
+            cwd=run_dir,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
 
         # If latexmk fails, try pdflatex
@@ -64,33 +114,44 @@ def compile_latex(project_dir, main_tex):
             logger.warning("latexmk failed, trying pdflatex...")
             result = subprocess.run(
                 ["pdflatex", "-interaction=nonstopmode", main_tex_file],
-                capture_output=True,
-                text=True,
+                cwd=run_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
             )
 
-            # Run bibtex if needed
-            if "No file" in result.stdout and ".aux" in result.stdout:
+            # Run bibtex if needed; the log is searched as raw bytes
+            if b"No file" in result.stdout and b".aux" in result.stdout:
                 logger.info("Running bibtex...")
                 subprocess.run(
-                    ["bibtex", os.path.splitext(main_tex_file)[0]], capture_output=True
+                    ["bibtex", os.path.splitext(main_tex_file)[0]],
+                    cwd=run_dir,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
                 )
 
-                # Run pdflatex again (twice to ensure references are correct)
+                # Run pdflatex again (twice to ensure references are correct);
+                # only the final pass needs to write the PDF
                 subprocess.run(
-                    ["pdflatex", "-interaction=nonstopmode", main_tex_file],
-                    capture_output=True,
-                    text=True,
+                    [
+                        "pdflatex",
+                        "-interaction=nonstopmode",
+                        "-draftmode",
+                        main_tex_file,
+                    ],
+                    cwd=run_dir,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
                 )
                 subprocess.run(
                     ["pdflatex", "-interaction=nonstopmode", main_tex_file],
-                    capture_output=True,
-                    text=True,
+                    cwd=run_dir,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
                 )
 
         # Check if PDF was generated
-        if os.path.exists(pdf_name):
-            # Return absolute path
-            pdf_path = os.path.abspath(pdf_name)
+        pdf_path = os.path.abspath(os.path.join(run_dir, pdf_name))
+        if os.path.exists(pdf_path):
             logger.info(f"Successfully compiled: {pdf_path}")
             return pdf_path
         else:
@@ -100,121 +161,435 @@ def compile_latex(project_dir, main_tex):
     except Exception as e:
         logger.error(f"Error compiling LaTeX: {e}")
         return None
-    finally:
-        # Restore original directory
-        os.chdir(original_dir)
+
+
+def fingerprint_project(project_dir, main_tex, exclude_dirs=()):
+    """
+    Hash the sources of a LaTeX project into a cache key.
+
+    Every file except build outputs counts as a source, so data files read
+    through \\input, listings or plots are covered too. Each one contributes
+    its relative path, mtime, size and a hash of its first 64 KiB, which is
+    enough to notice edits without reading every figure in full. Directories
+    in exclude_dirs, such as another project nested inside this one, are
+    skipped.
+    """
+    # The compiled PDF lives next to the sources but is not one of them
+    output_pdf = os.path.normpath(os.path.splitext(main_tex)[0] + ".pdf")
+    # Never hash the PDF cache itself, should it sit inside the project
+    skipped_dirs = {os.path.abspath(d) for d in exclude_dirs}
+    skipped_dirs.add(os.path.abspath(CACHE_DIR))
+
+    entries = []
+    for root, dirs, files in os.walk(project_dir):
+        dirs[:] = [
+            d
+            for d in dirs
+            if not d.startswith(IGNORED_DIR_PREFIXES)
+            and os.path.abspath(os.path.join(root, d)) not in skipped_dirs
+        ]
+        for file in files:
+            if file.lower().endswith(BUILD_EXTENSIONS):
+                continue
+            path = os.path.join(root, file)
+            rel_path = os.path.relpath(path, project_dir)
+            if rel_path == output_pdf:
+                continue
+            stat = os.stat(path)
+            with open(path, "rb") as f:
+                prefix_hash = hashlib.sha256(f.read(1 << 16)).hexdigest()
+            entries.append((rel_path, stat.st_mtime_ns, stat.st_size, prefix_hash))
+
+    h = hashlib.sha256(main_tex.encode("utf-8"))
+    for entry in sorted(entries):
+        h.update(repr(entry).encode("utf-8"))
+    return h.hexdigest()
+
+
+def compile_latex_cached(project_dir, main_tex, exclude_dirs=()):
+    """
+    Compile a LaTeX project, reusing a cached PDF if its sources are unchanged.
+
+    exclude_dirs is passed on to fingerprint_project.
+
+    Returns:
+        Path to the compiled (or cached) PDF file, or None if compilation failed
+    """
+    try:
+        key = fingerprint_project(project_dir, main_tex, exclude_dirs)
+    except OSError as e:
+        logger.warning(f"Could not fingerprint {project_dir}, not using cache: {e}")
+        return compile_latex(project_dir, main_tex)
+
+    # Cached PDFs are named <project>-<fingerprint>.pdf, so older entries of
+    # the same project can be found and dropped
+    project_id = hashlib.sha256(
+        f"{os.path.abspath(project_dir)}\0{main_tex}".encode("utf-8")
+    ).hexdigest()[:16]
+    cached_pdf = os.path.join(CACHE_DIR, f"{project_id}-{key}.pdf")
+    if os.path.exists(cached_pdf):
+        logger.info(f"Sources unchanged, using cached PDF: {cached_pdf}")
+        return cached_pdf
+
+    pdf_path = compile_latex(project_dir, main_tex)
+    if not pdf_path:
+        return None
+
+    # Write to a temporary name first so a partial copy is never picked up
+    try:
+        # Compiling can rewrite files the fingerprint counts, such as a .bbl,
+        # so key the PDF by the sources as the next run will find them
+        key = fingerprint_project(project_dir, main_tex, exclude_dirs)
+        cached_pdf = os.path.join(CACHE_DIR, f"{project_id}-{key}.pdf")
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        os.close(fd)
+        shutil.copy2(pdf_path, tmp_path)
+        os.replace(tmp_path, cached_pdf)
+
+        # The sources changed since any older entry, so it can never be hit
+        for name in os.listdir(CACHE_DIR):
+            stale = os.path.join(CACHE_DIR, name)
+            if name.startswith(f"{project_id}-") and stale != cached_pdf:
+                os.remove(stale)
+    except OSError as e:
+        logger.warning(f"Could not cache compiled PDF: {e}")
+    return pdf_path
 
 
 def hash_file(file_path):
     """Calculate SHA-256 hash of a file"""
-    h = hashlib.sha256()
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            h.update(chunk)
+        # hashlib.file_digest runs the whole read/update loop in C
+        if sys.version_info >= (3, 11):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+        # Otherwise hash a read-only mapping of the file in a single update;
+        # mmap refuses empty files, so those keep the empty digest
+        h = hashlib.sha256()
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
     return h.hexdigest()
 
 
-def compare_pdf_hashes(pdf1_path, pdf2_path):
-    """Compare hashes of two PDF files"""
-    hash1 = hash_file(pdf1_path)
-    hash2 = hash_file(pdf2_path)
+def files_identical(path1, path2, chunk_size=1 << 20):
+    """Compare two files byte by byte, stopping at the first differing block"""
+    if os.path.getsize(path1) != os.path.getsize(path2):
+        return False
+
+    with open(path1, "rb") as f1, open(path2, "rb") as f2:
+        while True:
+            chunk1 = f1.read(chunk_size)
+            chunk2 = f2.read(chunk_size)
+            if chunk1 != chunk2:
+                return False
+            if not chunk1:
+                return True
+
+
+def compare_pdf_hashes(pdf1_path, pdf2_path, verbose=False):
+    """
+    Check whether two PDF files are byte-identical.
 
-    if hash1 == hash2:
-        logger.info("PDF hashes match perfectly! Content is identical.")
+    A direct comparison gives the same answer as comparing SHA-256 hashes,
+    but stops at the first difference and skips the hashing work. The
+    hashes are only computed to be logged when verbose is set.
+    """
+    if verbose:
+        logger.info(f"Original PDF SHA-256: {hash_file(pdf1_path)}")
+        logger.info(f"Cleaned PDF SHA-256: {hash_file(pdf2_path)}")
+
+    if files_identical(pdf1_path, pdf2_path):
+        logger.info("PDF files match perfectly! Content is identical.")
         return True
     else:
-        logger.info("PDF hashes don't match. Further checking needed.")
+        logger.info("PDF files don't match. Further checking needed.")
         return False
 
 
-def extract_pdf_text(pdf_path):
-    """Extract text content from a PDF"""
+def _extract_page_text(pdf_path, page_index):
+    """Extract the text of a single page; runs in a worker process"""
+    reader = _worker_readers.get(pdf_path)
+    if reader is None:
+        reader = _worker_readers[pdf_path] = PdfReader(pdf_path)
+    return reader.pages[page_index].extract_text() or ""
+
+
+def extract_pdf_pages(pdf_path, n_pages):
+    """Extract the text content of each of the n_pages pages of a PDF"""
     try:
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n\n"
-        return text
+        # Pages are independent, so extract them in parallel
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            return list(
+                executor.map(_extract_page_text, repeat(pdf_path), range(n_pages))
+            )
     except Exception as e:
         logger.error(f"Error extracting PDF text: {e}")
         return None
 
 
-def compare_pdf_text(pdf1_path, pdf2_path, verbose=False):
-    """Compare text content of two PDFs"""
-    text1 = extract_pdf_text(pdf1_path)
-    text2 = extract_pdf_text(pdf2_path)
+def compare_pdf_text(pdf1_path, pdf2_path, verbose=False, page_counts=None):
+    """
+    Compare text content of two PDFs page by page.
 
-    if text1 is None or text2 is None:
+    page_counts holds the page count of each PDF if the caller already has
+    them, so the files are not parsed again just to count pages.
+    """
+    if page_counts is None:
+        page_counts = (count_pdf_pages(pdf1_path), count_pdf_pages(pdf2_path))
+    pages1, pages2 = page_counts
+    if pages1 is None or pages2 is None:
         return False
 
-    # Normalize text (remove excess whitespace)
-    text1 = re.sub(r"\s+", " ", text1).strip()
-    text2 = re.sub(r"\s+", " ", text2).strip()
-
-    if text1 == text2:
-        logger.info("PDF text content matches perfectly!")
-        return True
-    else:
-        # Show differences
-        diff = difflib.unified_diff(
-            text1.splitlines(),
-            text2.splitlines(),
-            fromfile="Original PDF",
-            tofile="Cleaned PDF",
-            lineterm="",
+    # A different page count settles it without extracting any text
+    if pages1 != pages2:
+        logger.info(
+            f"PDFs have different page counts: Original {pages1} pages, Cleaned {pages2} pages"
         )
+        return False
+
+    texts1 = extract_pdf_pages(pdf1_path, pages1)
+    texts2 = extract_pdf_pages(pdf2_path, pages2)
 
-        if verbose:
-            diff_text = "\n".join(list(diff))
-            logger.info(f"PDF text content has differences:\n{diff_text}\n...")
+    if texts1 is None or texts2 is None:
         return False
 
+    # Stop at the first page that differs
+    for i, (page1, page2) in enumerate(zip(texts1, texts2)):
+        # Normalize text (remove excess whitespace) in a single C-level pass
+        text1 = " ".join(page1.split())
+        text2 = " ".join(page2.split())
+
+        if text1 != text2:
+            # Only build the diff when it is going to be shown
+            if verbose:
+                diff = difflib.unified_diff(
+                    page1.splitlines(),
+                    page2.splitlines(),
+                    fromfile="Original PDF",
+                    tofile="Cleaned PDF",
+                    lineterm="",
+                )
+                diff_text = "\n".join(diff)
+                logger.info(
+                    f"PDF text content has differences on page {i+1}:\n{diff_text}\n..."
+                )
+            return False
+
+    logger.info("PDF text content matches perfectly!")
+    return True
+
+
+def count_pdf_pages(pdf_path):
+    """Return the number of pages in a PDF, or None if it cannot be read"""
+    try:
+        return len(PdfReader(pdf_path).pages)
+    except Exception as e:
+        logger.error(f"Error reading PDF page count: {e}")
+        return None
+
 
-def convert_pdf_to_images(pdf_path, dpi=300):
-    """Convert PDF to list of images"""
+def convert_pdf_to_images(
+    pdf_path, output_folder, dpi=300, first_page=None, last_page=None
+):
+    """Render PDF pages to image files in output_folder and return their paths"""
     try:
-        return convert_from_path(pdf_path, dpi=dpi)
+        # Rasterize pages in parallel; pdftoppm only honours thread_count
+        # when it writes pages to an output folder
+        return convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            output_folder=output_folder,
+            first_page=first_page,
+            last_page=last_page,
+            thread_count=max(1, (os.cpu_count() or 1) - 1),
+            paths_only=True,
+        )
     except Exception as e:
         logger.error(f"Error converting PDF to images: {e}")
         return []
 
 
-def compare_pdf_visually(pdf1_path, pdf2_path, threshold=0.01):
-    """Compare visual content of two PDFs"""
-    images1 = convert_pdf_to_images(pdf1_path)
-    images2 = convert_pdf_to_images(pdf2_path)
+def thumbnail_hashes(pdf_path, n_pages):
+    """
+    Hash a small thumbnail of every page of a PDF.
 
-    if len(images1) != len(images2):
-        logger.info(
-            f"PDFs have different page counts: Original {len(images1)} pages, Cleaned {len(images2)} pages"
+    Returns None on failure, including when fewer than n_pages pages
+    were rendered.
+    """
+    try:
+        if pyvips:
+            thumbnails = (
+                pyvips.Image.thumbnail(
+                    f"{pdf_path}[page={i}]", THUMBNAIL_SIZE
+                ).write_to_memory()
+                for i in range(n_pages)
+            )
+        else:
+            thumbnails = (
+                image.tobytes()
+                for image in convert_from_path(pdf_path, size=(THUMBNAIL_SIZE, None))
+            )
+        hashes = [hashlib.sha256(thumbnail).digest() for thumbnail in thumbnails]
+    except Exception as e:
+        logger.warning(f"Could not render page thumbnails: {e}")
+        return None
+
+    if len(hashes) != n_pages:
+        logger.warning(
+            f"Rendered {len(hashes)} of {n_pages} page thumbnails for {pdf_path}"
         )
-        return False
+        return None
+    return hashes
+
+
+def load_page_image(page_path):
+    """Load a rendered page as a grayscale array"""
+    # The cleaner changes content rather than colours, and grayscale pages
+    # are a quarter of the bytes of RGBA ones to compare
+    with Image.open(page_path) as image:
+        # convert() decodes the page into a dense "L" image; asarray wraps
+        # its pixel buffer instead of copying it once more
+        return np.asarray(image.convert("L"))
 
-    identical = True
-    for i, (img1, img2) in enumerate(zip(images1, images2)):
-        # Ensure both images have the same dimensions
-        if img1.size != img2.size:
-            logger.info(
-                f"Page {i+1} has different dimensions: {img1.size} vs {img2.size}"
-            )
-            identical = False
-            continue
 
-        # Convert to NumPy arrays for comparison
-        arr1 = np.array(img1)
-        arr2 = np.array(img2)
+def load_page_vips(pdf_path, page, dpi=300):
+    """Render a single PDF page to a grayscale array using libvips"""
+    img = pyvips.Image.pdfload(pdf_path, page=page, dpi=dpi)
+
+    # Keep only the luminance band and wrap it without further copies
+    img = img.colourspace("b-w").extract_band(0)
+    return np.ndarray(
+        buffer=img.write_to_memory(),
+        dtype=np.uint8,
+        shape=[img.height, img.width],
+    )
+
+
+def _load_page(page):
+    """Load a page given as an image path or a (pdf_path, page, dpi) tuple"""
+    if isinstance(page, tuple):
+        return load_page_vips(*page)
+    return load_page_image(page)
 
-        # Calculate differences
-        diff_pixels = np.sum(arr1 != arr2)
-        total_pixels = arr1.size
-        diff_ratio = diff_pixels / total_pixels
 
-        if diff_ratio > threshold:
-            logger.info(f"Page {i+1} has difference ratio: {diff_ratio:.2%}")
-            identical = False
+def _diff_page(page1, page2):
+    """
+    Compare a pair of pages; runs in a worker process.
+
+    Returns the ratio of differing pixels, or None if the dimensions differ,
+    along with both page dimensions.
+    """
+    arr1 = _load_page(page1)
+    arr2 = _load_page(page2)
 
-    return identical
+    # Ensure both images have the same dimensions
+    if arr1.shape != arr2.shape:
+        return None, arr1.shape, arr2.shape
+
+    # Calculate differences, one byte per pixel
+    diff_pixels = np.count_nonzero(arr1 != arr2)
+    total_pixels = arr1.size
+    return diff_pixels / total_pixels, arr1.shape, arr2.shape
+
+
+def compare_pdf_visually(
+    pdf1_path, pdf2_path, threshold=0.01, dpi=100, full_report=False, page_counts=None
+):
+    """
+    Compare visual content of two PDFs.
+
+    Pages are rendered at a modest DPI, which is enough to catch layout
+    changes. The threshold is a ratio of differing pixels, so it does not
+    depend on the DPI. A quick pass over small page thumbnails skips pages
+    that render identically. The comparison stops at the first differing
+    page unless full_report is set. page_counts is used as in
+    compare_pdf_text.
+    """
+    # Check page counts before rendering anything
+    if page_counts is None:
+        page_counts = (count_pdf_pages(pdf1_path), count_pdf_pages(pdf2_path))
+    pages1, pages2 = page_counts
+    if pages1 is None or pages2 is None:
+        return False
+
+    if pages1 != pages2:
+        logger.info(
+            f"PDFs have different page counts: Original {pages1} pages, Cleaned {pages2} pages"
+        )
+        return False
+
+    # Pages whose thumbnails hash the same are treated as identical, so only
+    # the remaining pages are rendered at full resolution
+    hashes1 = thumbnail_hashes(pdf1_path, pages1)
+    hashes2 = thumbnail_hashes(pdf2_path, pages2)
+    if hashes1 is not None and hashes2 is not None:
+        changed = [i for i, (h1, h2) in enumerate(zip(hashes1, hashes2)) if h1 != h2]
+        if not changed:
+            logger.info("All page thumbnails match")
+            return True
+    else:
+        changed = list(range(pages1))
+
+    if not changed:
+        logger.info("PDFs have no pages to compare")
+        return True
+
+    output_folder = tempfile.mkdtemp()
+    try:
+        # Prefer libvips when it is installed, workers then render their own
+        # pages and skip the PPM/PIL round trip
+        if pyvips:
+            images1 = {i: (pdf1_path, i, dpi) for i in changed}
+            images2 = {i: (pdf2_path, i, dpi) for i in changed}
+        else:
+            # Render the span of pages that changed in one pdftoppm run
+            first, last = changed[0], changed[-1]
+            pages = range(first, last + 1)
+            paths1 = convert_pdf_to_images(
+                pdf1_path, output_folder, dpi, first_page=first + 1, last_page=last + 1
+            )
+            paths2 = convert_pdf_to_images(
+                pdf2_path, output_folder, dpi, first_page=first + 1, last_page=last + 1
+            )
+            if len(paths1) != len(pages) or len(paths2) != len(pages):
+                logger.info("Not all pages could be rendered for comparison")
+                return False
+            images1 = dict(zip(pages, paths1))
+            images2 = dict(zip(pages, paths2))
+
+        # Diff pages in parallel; each worker only holds the pair it compares
+        identical = True
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = [
+                executor.submit(_diff_page, images1[i], images2[i]) for i in changed
+            ]
+            for n, (i, future) in enumerate(zip(changed, futures)):
+                diff_ratio, size1, size2 = future.result()
+                if diff_ratio is None:
+                    logger.info(
+                        f"Page {i+1} has different dimensions: {size1} vs {size2}"
+                    )
+                elif diff_ratio > threshold:
+                    logger.info(f"Page {i+1} has difference ratio: {diff_ratio:.2%}")
+                else:
+                    continue
+
+                identical = False
+                if not full_report:
+                    # Drop the pages that have not started yet
+                    for pending in futures[n + 1 :]:
+                        pending.cancel()
+                    break
+
+        return identical
+    except Exception as e:
+        logger.error(f"Error comparing PDF pages: {e}")
+        return False
+    finally:
+        shutil.rmtree(output_folder, ignore_errors=True)
 
 
 def main():
@@ -238,39 +613,66 @@ def main():
         action="store_true",
         help="Perform visual comparison (slower but more accurate)",
     )
+    parser.add_argument(
+        "--force-visual",
+        action="store_true",
+        help="Run the visual comparison even when the text content is identical",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always recompile instead of reusing cached PDFs",
+    )
     parser.add_argument(
         "--verbose", "-v", action="store_true", help="Show detailed differences"
     )
 
     args = parser.parse_args()
 
-    # Compile both projects
-    logger.info("Compiling original project...")
-    original_pdf = compile_latex(args.original, args.main_tex)
+    # Compile both projects concurrently; the builds run as subprocesses,
+    # so threads are enough
+    def compile_project(project_dir, other_dir):
+        if args.no_cache:
+            return compile_latex(project_dir, args.main_tex)
+        # Either project may sit inside the other; the nested one is not a
+        # source of the outer one
+        return compile_latex_cached(project_dir, args.main_tex, [other_dir])
+
+    logger.info("Compiling original and cleaned projects...")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        original_future = executor.submit(compile_project, args.original, args.cleaned)
+        cleaned_future = executor.submit(compile_project, args.cleaned, args.original)
+        original_pdf = original_future.result()
+        cleaned_pdf = cleaned_future.result()
+
     if not original_pdf:
         logger.error("Original project compilation failed!")
         return 1
 
-    logger.info("Compiling cleaned project...")
-    cleaned_pdf = compile_latex(args.cleaned, args.main_tex)
     if not cleaned_pdf:
         logger.error("Cleaned project compilation failed!")
         return 1
 
     # Compare PDFs
     logger.info("Comparing PDF files...")
-    if compare_pdf_hashes(original_pdf, cleaned_pdf):
+    if compare_pdf_hashes(original_pdf, cleaned_pdf, args.verbose):
         logger.info("✅ Congratulations! The PDFs are identical.")
         return 0
 
     # Hashes differ, check text content
     logger.info("Comparing PDF text content...")
-    text_identical = compare_pdf_text(original_pdf, cleaned_pdf, args.verbose)
+    # Parse each PDF once; both comparisons start from its page count
+    page_counts = (count_pdf_pages(original_pdf), count_pdf_pages(cleaned_pdf))
+    text_identical = compare_pdf_text(
+        original_pdf, cleaned_pdf, args.verbose, page_counts=page_counts
+    )
 
-    # Perform visual comparison if requested
-    if args.visual:
+    # Perform visual comparison if requested and the text did not already match
+    if args.force_visual or (args.visual and not text_identical):
         logger.info("Performing visual comparison...")
-        visually_identical = compare_pdf_visually(original_pdf, cleaned_pdf)
+        visually_identical = compare_pdf_visually(
+            original_pdf, cleaned_pdf, full_report=args.verbose, page_counts=page_counts
+        )
         if visually_identical:
             logger.info("✅ Visual content is identical!")
         else:
@@ -13,6 +13,11 @@ import os
 import re
 import shutil
 import argparse
+import functools
+import mmap
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 import logging
 
@@ -20,220 +25,310 @@ import logging
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 logger = logging.getLogger(__name__)
 
-# Regex patterns
-INPUT_PATTERN = re.compile(r"\\(?:input|include|subfile)\{([^}]+)\}")
-BIBLIOGRAPHY_PATTERN = re.compile(r"\\bibliography\{([^}]+)\}")
-BIBLIOGRAPHYSTYLE_PATTERN = re.compile(r"\\bibliographystyle\{([^}]+)\}")
-GRAPHICS_PATTERN = re.compile(r"\\(?:includegraphics)(?:\[[^\]]*\])?\{([^}]+)\}")
-COMMENT_PATTERN = re.compile(r"(?<!\\)%.*?$", re.MULTILINE)
-# Pattern to match all citation commands
-CITATION_PATTERN = re.compile(
-    r"\\(?:"
-    r"cite[a-zA-Z]*|"  # Standard citation command
-    r"nocite|"  # \nocite command
-    r"cite\s+|"  # Allow spaces
-    r"[a-zA-Z]*cite[a-zA-Z]*"  # Any command containing "cite"
-    r")(?:\s+)?(?:\[[^\]]*\])?(?:\s+)?\{([^}]+)\}"
+# Regex patterns; files are read and scanned as bytes
+# Single pattern for every command find_dependencies looks for; the name of
+# the group that matched tells which kind of command was found
+DEPENDENCY_PATTERN = re.compile(
+    rb"\\(?:input|include|subfile)\{(?P<input>[^}]+)\}"
+    rb"|\\bibliography\{(?P<bibliography>[^}]+)\}"
+    rb"|\\bibliographystyle\{(?P<bibliographystyle>[^}]+)\}"
+    # Any command containing "cite" (\cite, \citep, \Citet, \parencite,
+    # \nocite, ...) with up to two optional arguments
+    rb"|\\[a-zA-Z]*[Cc]ite[a-zA-Z]*\s*(?:\[[^\]]*\]\s*){0,2}\{(?P<citation>[^}]+)\}"
+    rb"|\\includegraphics(?:\[[^\]]*\])?\{(?P<graphics>[^}]+)\}"
 )
-# Pattern to match BibTeX entries
-BIBENTRY_PATTERN = re.compile(r"@\w+\s*\{\s*([^,]+),.*?(?=@|\Z)", re.DOTALL)
+COMMENT_PATTERN = re.compile(rb"(?<!\\)%.*?$", re.MULTILINE)
+# Pattern to match comment environments
+COMMENT_ENV_PATTERN = re.compile(rb"\\begin\{comment\}.*?\\end\{comment\}", re.DOTALL)
+# Pattern to match a full-line comment including its newline, or the
+# comment part of a line
+TEX_COMMENT_PATTERN = re.compile(rb"^[^\S\n]*%.*\n?|(?<!\\)%.*", re.MULTILINE)
+# Pattern to match runs of three or more empty (or whitespace-only) lines;
+# the whitespace between newlines excludes "\n", so a run is never rescanned
+BLANK_LINES_PATTERN = re.compile(rb"\n[^\S\n]*\n[^\S\n]*\n[^\S\n]*\n(?:[^\S\n]*\n)*")
+# Patterns used to scan BibTeX files: an "@" or a comment between entries,
+# the head of an entry up to its key, and the braces inside an entry
+BIB_TOKEN_PATTERN = re.compile(rb"@|(?<!\\)%")
+BIBENTRY_HEAD_PATTERN = re.compile(rb"@\w+\s*\{\s*([^,{}\s]*)")
+BIB_BRACE_PATTERN = re.compile(rb"[{}]")
+
+# Extensions tried, in order, for graphics included without one
+GRAPHICS_EXTENSIONS = [".pdf", ".png", ".jpg", ".jpeg", ".eps", ".ps", ".tif", ".tiff"]
+
+# Files smaller than this are read rather than memory-mapped
+MMAP_MIN_SIZE = 64 * 1024
 
 global_base_dir = None
 
 
-def find_dependencies(
-    tex_file,
-    base_dir,
-    dependencies=None,
-    included_graphics=None,
-    cited_keys=None,
-    verbose=False,
-    dep_tree=None,
-    current_depth=0,
-):
-    """
-    Recursively find all dependencies and build dependency tree.
+class DepNode:
+    """A TeX or graphics file in the dependency tree."""
 
-    Args:
-        tex_file: The path to the TeX file to analyze
-        base_dir: The base directory of the project
-        dependencies: Set of already found dependencies (for recursion)
-        included_graphics: Set of already found graphics (for recursion)
-        cited_keys: Set of citation keys (for recursion)
-        verbose: Whether to print verbose information
-        dep_tree: Dictionary to store the dependency tree structure
-        current_depth: Current depth in the dependency tree
+    __slots__ = ("name", "type", "children", "depth")
 
-    Returns:
-        (dependencies, included_graphics, cited_keys, dep_tree): Sets of file paths and citation keys
+    def __init__(self, name, node_type, depth=0):
+        self.name = name
+        self.type = node_type
+        self.children = []
+        self.depth = depth
+
+
+@functools.lru_cache(maxsize=None)
+def _dir_listing(base_dir, dir_path):
+    """
+    List a project directory once so later existence checks are set lookups.
+
+    Returns the entry names, and the same names lowercased.
     """
-    if dependencies is None:
-        dependencies = set()
-    if included_graphics is None:
-        included_graphics = set()
-    if cited_keys is None:
-        cited_keys = set()
-    if dep_tree is None:
-        dep_tree = {"name": tex_file, "type": "tex", "children": [], "depth": 0}
-
-    # Normalize the file path
     try:
-        if not tex_file.endswith(".tex"):
-            for ext in [".tex", ""]:
-                test_path = tex_file + ext
-                if os.path.exists(os.path.join(global_base_dir, test_path)):
-                    tex_file = test_path
-                    break
-    except Exception as e:
-        logger.error(f"Error normalizing path {tex_file}: {e}")
-        return dependencies, included_graphics, cited_keys, dep_tree
+        names = os.listdir(os.path.join(base_dir, dir_path))
+    except OSError:
+        names = []
+    return frozenset(names), frozenset(name.lower() for name in names)
 
-    full_path = os.path.join(global_base_dir, tex_file)
 
-    if not os.path.exists(full_path):
-        logger.warning(f"File not found: {full_path}")
-        return dependencies, included_graphics, cited_keys, dep_tree
+def _path_exists(base_dir, rel_path):
+    """
+    Check whether rel_path exists under base_dir, like os.path.exists.
 
-    # Avoid processing the same file twice
-    if tex_file in dependencies:
-        return dependencies, included_graphics, cited_keys, dep_tree
+    Cached directory listings rule out most missing files without a
+    syscall. A listed name is still confirmed on disk, since a broken
+    symlink is listed but does not exist, and so is a name listed only
+    with different case, which exists on case-insensitive file systems.
+    """
+    dir_path, name = os.path.split(os.path.normpath(rel_path))
+    names, lowered_names = _dir_listing(base_dir, dir_path)
+    if name in names or name.lower() in lowered_names:
+        return os.path.exists(os.path.join(base_dir, rel_path))
+    return False
 
-    # Add this file to dependencies
-    dependencies.add(tex_file)
 
-    if verbose:
-        logger.info(f"Processing: {tex_file}")
+def _read_source(path):
+    """Read a file as bytes, with line endings normalized to \\n like text mode."""
+    with open(path, "rb") as f:
+        content = f.read()
+    if b"\r" in content:
+        content = content.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    return content
 
-    try:
-        with open(full_path, "r", encoding="utf-8") as f:
-            content = f.read()
 
+@contextmanager
+def _mmap_read(path):
+    """
+    Give the contents of a file as a bytes-like object for the regexes.
+
+    Large files are memory-mapped instead of copied into memory. Small
+    files, and files with \\r line endings to normalize, are read with
+    _read_source.
+
+    Callers must drop any finditer() iterator over the mapping before the
+    context exits, as an iterator keeps the mapping from being closed.
+    """
+    if os.path.getsize(path) >= MMAP_MIN_SIZE:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with mm:
+            if mm.find(b"\r") == -1:
+                yield mm
+                return
+    yield _read_source(path)
+
+
+def _resolve_graphics(graphics_path):
+    """Find the image an \\includegraphics path refers to, or None."""
+    # The exact path comes first, then each extension in order
+    for ext in ["", *GRAPHICS_EXTENSIONS]:
+        if _path_exists(global_base_dir, graphics_path + ext):
+            return graphics_path + ext
+    return None
+
+
+def _normalize_tex_path(tex_file):
+    """Resolve an \\input argument to a project file, adding .tex if needed."""
+    if not tex_file.endswith(".tex"):
+        for ext in [".tex", ""]:
+            test_path = tex_file + ext
+            if _path_exists(global_base_dir, test_path):
+                return test_path
+    return tex_file
+
+
+def _scan_tex_file(tex_file):
+    """
+    Read a TeX file and list the dependency commands it contains.
+
+    Only touches the file itself, so it can run on a worker thread.
+
+    Returns:
+        List of (kind, argument) pairs in document order, arguments decoded
+        to str
+    """
+    with _mmap_read(os.path.join(global_base_dir, tex_file)) as content:
         # First, remove comments to ensure we only process non-commented commands
-        content_without_comments = re.sub(
-            r"(?<!\\)%.*?$", "", content, flags=re.MULTILINE
-        )
+        content_without_comments = COMMENT_PATTERN.sub(b"", content)
+
+    # Also remove comment environments
+    content_without_comments = COMMENT_ENV_PATTERN.sub(b"", content_without_comments)
+
+    commands = []
+    for match in DEPENDENCY_PATTERN.finditer(content_without_comments):
+        argument = match.group(match.lastgroup)
+        commands.append((match.lastgroup, argument.decode("utf-8", "surrogateescape")))
+    return commands
 
-        # Also remove comment environments
-        content_without_comments = re.sub(
-            r"\\begin\{comment\}.*?\\end\{comment\}",
-            "",
-            content_without_comments,
-            flags=re.DOTALL,
+
+def _build_dependency_tree(name, node_type, children, depth=0, visited=None):
+    """
+    Build the dependency tree below name from the parent -> children map.
+
+    A file is expanded only where it is first reached; later references to
+    it, including cycles back to an ancestor, are leaves.
+    """
+    if visited is None:
+        visited = set()
+
+    node = DepNode(name, node_type, depth)
+    if name in visited:
+        return node
+    visited.add(name)
+
+    for child_type, child_name in children.get(name, ()):
+        node.children.append(
+            _build_dependency_tree(child_name, child_type, children, depth + 1, visited)
         )
+    return node
 
-        current_node = {
-            "name": tex_file,
-            "type": "tex",
-            "children": [],
-            "depth": current_depth,
-        }
 
-        # Find all \input, \include, \subfile commands in non-commented text
-        for match in INPUT_PATTERN.finditer(content_without_comments):
-            input_path = match.group(1).strip()
-            input_dir = os.path.dirname(tex_file)
-            logger.debug(f"input_path: {input_path}, input_dir: {input_dir}")
+def find_dependencies(tex_file, base_dir, verbose=False):
+    """
+    Find all dependencies and build dependency tree.
 
-            if verbose:
-                logger.info(f"++ Found recursive input: {input_path}")
-
-            # Recursively find dependencies in the included file
-            dependencies, included_graphics, cited_keys, child_tree = find_dependencies(
-                input_path,
-                global_base_dir,
-                dependencies,
-                included_graphics,
-                cited_keys,
-                verbose,
-                dep_tree=None,
-                current_depth=current_depth + 1,
-            )
-            if child_tree:
-                current_node["children"].append(child_tree)
-
-        # Find bibliography files
-        for match in BIBLIOGRAPHY_PATTERN.finditer(content_without_comments):
-            bib_files = match.group(1).split(",")
-            for bib_file in bib_files:
-                bib_file = bib_file.strip()
-                if not bib_file.endswith(".bib"):
-                    bib_file += ".bib"
-                bib_path = os.path.join(os.path.dirname(tex_file), bib_file)
-                dependencies.add(bib_path)
-                if verbose:
-                    logger.info(f"Found bibliography: {bib_path}")
-
-        # Find bibliography style files
-        for match in BIBLIOGRAPHYSTYLE_PATTERN.finditer(content_without_comments):
-            bst_file = match.group(1).strip()
-            if not bst_file.endswith(".bst"):
-                bst_file += ".bst"
-            bst_path = os.path.join(os.path.dirname(tex_file), bst_file)
-            dependencies.add(bst_path)
-            if verbose:
-                logger.info(f"Found bibliography style: {bst_path}")
-
-        # Find all citations in non-commented text
-        for match in CITATION_PATTERN.finditer(content_without_comments):
-            # Citations can be comma-separated
-            keys = match.group(1).split(",")
-            for key in keys:
-                key_clean = key.strip()
-                cited_keys.add(key_clean)
-                if verbose:
-                    logger.info(f"Found citation key: {key_clean}")
+    TeX files are visited breadth-first from tex_file; their reads run on a
+    thread pool so the next files are loaded while the current one is parsed.
 
-        # Find all graphics in non-commented text
-        for match in GRAPHICS_PATTERN.finditer(content_without_comments):
-            graphics_path = match.group(1).strip()
+    Args:
+        tex_file: The path to the main TeX file to analyze
+        base_dir: The base directory of the project
+        verbose: Whether to print verbose information
 
-            # Handle path without extension (LaTeX can omit the extension)
-            # the graphics_path is relative to the tex_file
-            base_graphics_path = graphics_path
+    Returns:
+        (dependencies, included_graphics, cited_keys, dep_tree): Sets of file paths and citation keys
+    """
+    dependencies = set()
+    included_graphics = set()
+    cited_keys = set()
+    # Parent -> [(type, name), ...] in document order, for the tree
+    children = {}
+    # Files that could not be read; they are left out of the tree
+    failed = set()
+
+    queue = deque()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+
+        def visit(path):
+            # Queue a TeX file for reading unless it is missing or already seen
+            if not _path_exists(global_base_dir, path):
+                full_path = os.path.join(global_base_dir, path)
+                logger.warning(f"File not found: {full_path}")
+            elif path not in dependencies:
+                dependencies.add(path)
+                queue.append((path, executor.submit(_scan_tex_file, path)))
+
+        tex_file = _normalize_tex_path(tex_file)
+        visit(tex_file)
+
+        while queue:
+            current, future = queue.popleft()
 
             if verbose:
-                logger.info(f"Found graphics: {base_graphics_path}")
-
-            # Try common image extensions if no extension is provided
-            extensions = [
-                "",
-                ".pdf",
-                ".png",
-                ".jpg",
-                ".jpeg",
-                ".eps",
-                ".ps",
-                ".tif",
-                ".tiff",
-            ]
-            found = False
-
-            for ext in extensions:
-                test_path = base_graphics_path + ext
-                if os.path.exists(os.path.join(global_base_dir, test_path)):
-                    included_graphics.add(test_path)
-                    # Add graphics file to dependency tree
-                    current_node["children"].append(
-                        {
-                            "name": test_path,
-                            "type": "graphics",
-                            "children": [],
-                            "depth": current_depth + 1,
-                        }
-                    )
-                    found = True
+                logger.info(f"Processing: {current}")
+
+            try:
+                commands = future.result()
+            except Exception as e:
+                logger.error(f"Error processing {current}: {e}")
+                failed.add(current)
+                continue
+
+            current_children = children[current] = []
+
+            for kind, argument in commands:
+                if kind == "input":
+                    # \input, \include and \subfile commands
+                    input_path = argument.strip()
+                    input_dir = os.path.dirname(current)
+                    logger.debug(f"input_path: {input_path}, input_dir: {input_dir}")
+
+                    if verbose:
+                        logger.info(f"++ Found recursive input: {input_path}")
+
+                    input_path = _normalize_tex_path(input_path)
+                    current_children.append(("tex", input_path))
+                    visit(input_path)
+
+                elif kind == "bibliography":
+                    for bib_file in argument.split(","):
+                        bib_file = bib_file.strip()
+                        if not bib_file.endswith(".bib"):
+                            bib_file += ".bib"
+                        bib_path = os.path.join(os.path.dirname(current), bib_file)
+                        dependencies.add(bib_path)
+                        if verbose:
+                            logger.info(f"Found bibliography: {bib_path}")
+
+                elif kind == "bibliographystyle":
+                    bst_file = argument.strip()
+                    if not bst_file.endswith(".bst"):
+                        bst_file += ".bst"
+                    bst_path = os.path.join(os.path.dirname(current), bst_file)
+                    dependencies.add(bst_path)
                     if verbose:
-                        logger.info(f"{base_graphics_path} Resolved to: {test_path}")
-                    break
+                        logger.info(f"Found bibliography style: {bst_path}")
 
-            if not found:
-                logger.warning(f"Image not found: {base_graphics_path}")
+                elif kind == "citation":
+                    # Citations can be comma-separated
+                    for key in argument.split(","):
+                        key_clean = key.strip()
+                        cited_keys.add(key_clean)
+                        if verbose:
+                            logger.info(f"Found citation key: {key_clean}")
 
-        return dependencies, included_graphics, cited_keys, current_node
+                elif kind == "graphics":
+                    graphics_path = argument.strip()
 
-    except Exception as e:
-        logger.error(f"Error processing {tex_file}: {e}")
-        return dependencies, included_graphics, cited_keys, None
+                    # Handle path without extension (LaTeX can omit the extension)
+                    # the graphics_path is relative to the tex_file
+                    base_graphics_path = graphics_path
+
+                    if verbose:
+                        logger.info(f"Found graphics: {base_graphics_path}")
+
+                    # Try common image extensions if no extension is provided
+                    test_path = _resolve_graphics(base_graphics_path)
+
+                    if test_path is not None:
+                        included_graphics.add(test_path)
+                        # Add graphics file to dependency tree
+                        current_children.append(("graphics", test_path))
+                        if verbose:
+                            logger.info(
+                                f"{base_graphics_path} Resolved to: {test_path}"
+                            )
+                    else:
+                        logger.warning(f"Image not found: {base_graphics_path}")
+
+    # Leave unreadable files out of the tree, as they contribute nothing
+    for current_children in children.values():
+        current_children[:] = [
+            child for child in current_children if child[1] not in failed
+        ]
+    dep_tree = (
+        None
+        if tex_file in failed
+        else _build_dependency_tree(tex_file, "tex", children)
+    )
+
+    return dependencies, included_graphics, cited_keys, dep_tree
 
 
 def remove_comments(content):
@@ -244,111 +339,110 @@ def remove_comments(content):
     1. Removes full-line comments
     2. Removes inline comments
     3. Preserves original line structure and spacing
-    """
-    result = []
-    lines = content.splitlines(True)
 
-    for line in lines:
-        # skip the whole line comment
-        stripped = line.lstrip()
-        if stripped and stripped[0] == "%":
-            continue
-
-        # process the inline comment
-        comment_pos = -1
-        i = 0
-        while i < len(line):
-            if line[i] == "%":
-                # ensure it is not an escaped \%
-                if i == 0 or line[i - 1] != "\\":
-                    comment_pos = i
-                    break
-            i += 1
-
-        # add the line without comments
-        if comment_pos != -1:
-            # keep the part before the comment
-            result.append(line[:comment_pos])
-            # if the line ends with a newline, add a newline
-            if line.endswith("\n"):
-                result.append("\n")
-        else:
-            result.append(line)
-
-    # join all lines
-    text = "".join(result)
+    Works on the raw bytes of the file.
+    """
+    # Drop full-line comments with their newline and cut inline comments at
+    # the first unescaped %, all in one regex pass
+    text = TEX_COMMENT_PATTERN.sub(b"", content)
 
     # clean: remove consecutive 3+ empty lines
-    text = re.sub(r"\n\s*\n\s*\n\s*\n+", "\n\n\n", text)
+    text = BLANK_LINES_PATTERN.sub(b"\n\n\n", text)
 
     # ensure the file ends with a newline
-    if text and not text.endswith("\n"):
-        text += "\n"
+    if text and not text.endswith(b"\n"):
+        text += b"\n"
 
     return text
 
 
-def filter_bib_file(src_path, dest_path, cited_keys):
-    """Copy only the cited entries from a BIB file, preserving formatting."""
-    try:
-        with open(src_path, "r", encoding="utf-8") as f:
-            content = f.read()
+def iter_bib_entries(text, keys=None):
+    """
+    Yield (start, end, key) for each entry of a BibTeX file given as bytes.
 
-        # Remove comments while preserving formatting
-        content = re.sub(r"(?<!\\)%.*?$", "", content, flags=re.MULTILINE)
+    The file is scanned once from left to right. Each entry ends at the
+    brace matching its opening brace, so "@" signs inside fields do not
+    split entries. An entry that is never closed ends at the next "@". Comments are only recognized between entries, where an
+    unescaped % hides the rest of the line.
 
-        # If there are no citation keys or \nocite{*} is used, keep all entries but delete comments
-        if not cited_keys or "*" in cited_keys:
-            logger.warning(f"Keeping all entries in {os.path.basename(src_path)}")
-            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-            with open(dest_path, "w", encoding="utf-8") as f:
-                f.write(content)
+    If keys is given, only entries whose key is in it are yielded; the
+    others are stepped over without building anything for them.
+    """
+    pos = 0
+    while True:
+        token = BIB_TOKEN_PATTERN.search(text, pos)
+        if token is None:
             return
 
-        # Find all BibTeX entries
-        entries = []
-        entry_positions = []
+        if token.group() == b"%":
+            newline = text.find(b"\n", token.end())
+            pos = len(text) if newline == -1 else newline + 1
+            continue
 
-        for match in BIBENTRY_PATTERN.finditer(content):
-            entry_text = match.group(0)
-            entry_key = match.group(1).strip()
-            start, end = match.span()
+        head = BIBENTRY_HEAD_PATTERN.match(text, token.start())
+        if head is None:
+            pos = token.end()
+            continue
 
-            # Record entry position and content
-            if entry_key in cited_keys:
-                entries.append(entry_text)
-                entry_positions.append((start, end, entry_key))
+        # Walk the braces until the one that closes the entry
+        depth = 1
+        pos = head.end()
+        while depth:
+            brace = BIB_BRACE_PATTERN.search(text, pos)
+            if brace is None:
+                break
+            depth += 1 if brace.group() == b"{" else -1
+            pos = brace.end()
 
-        # If there are no matching entries, keep all
-        if not entries:
-            logger.warning(
-                f"No matching entries found in {os.path.basename(src_path)}. Keeping all."
-            )
-            with open(dest_path, "w", encoding="utf-8") as f:
-                f.write(content)
+        if depth:
+            # The entry is never closed; like BibTeX, resync at the next "@"
+            next_entry = text.find(b"@", head.end())
+            pos = len(text) if next_entry == -1 else next_entry
+
+        if keys is None:
+            yield token.start(), pos, head.group(1)
+        elif head.group(1) in keys:
+            yield token.start(), pos, head.group(1)
+
+
+def filter_bib_file(src_path, dest_path, cited_keys):
+    """Copy only the cited entries from a BIB file, preserving formatting."""
+    try:
+        # If there are no citation keys or \nocite{*} is used, keep the whole
+        # file as it is; BibTeX skips comment lines between entries anyway
+        if not cited_keys or "*" in cited_keys:
+            logger.warning(f"Keeping all entries in {os.path.basename(src_path)}")
+            shutil.copy2(src_path, dest_path)
             return
 
-        # Sort entry positions by original order
-        entry_positions.sort()
+        # Keys are matched against the raw bytes of the file
+        cited_keys = {key.encode("utf-8", "surrogateescape") for key in cited_keys}
 
-        # Rebuild the BIB file, preserving whitespace and formatting between entries
-        filtered_content = ""
-        for i, (start, end, key) in enumerate(entry_positions):
-            entry_text = content[start:end]
+        with _mmap_read(src_path) as content:
+            # Find the cited BibTeX entries, in file order, removing comments
+            # while preserving formatting
+            entries = [
+                COMMENT_PATTERN.sub(b"", content[start:end])
+                for start, end, _ in iter_bib_entries(content, cited_keys)
+            ]
 
-            # Add a prefix newline for each entry (except the first one)
-            if i > 0:
-                # Ensure there is a newline between entries
-                filtered_content += "\n\n"
+            # If there are no matching entries, keep all
+            if not entries:
+                logger.warning(
+                    f"No matching entries found in {os.path.basename(src_path)}. Keeping all."
+                )
+                with open(dest_path, "wb") as f:
+                    f.write(COMMENT_PATTERN.sub(b"", content))
+                return
 
-            filtered_content += entry_text
+        # Rebuild the BIB file with a blank line between entries
+        filtered_content = b"\n\n".join(entries)
 
         # Ensure the file ends with a newline
-        if not filtered_content.endswith("\n"):
-            filtered_content += "\n"
+        if not filtered_content.endswith(b"\n"):
+            filtered_content += b"\n"
 
-        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-        with open(dest_path, "w", encoding="utf-8") as f:
+        with open(dest_path, "wb") as f:
             f.write(filtered_content)
 
         logger.info(
@@ -363,8 +457,7 @@ def filter_bib_file(src_path, dest_path, cited_keys):
 
 def copy_clean_file(src_path, dest_path, cited_keys=None):
     """Copy a file while removing comments if it's a TeX file, or filtering if it's a BIB file."""
-    # Create parent directories if they don't exist
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    # The destination directory is created by the caller
 
     # For BIB files, filter out unused entries
     if src_path.endswith(".bib") and cited_keys is not None:
@@ -373,12 +466,11 @@ def copy_clean_file(src_path, dest_path, cited_keys=None):
     # For TeX files, remove comments before copying
     elif src_path.endswith(".tex"):
         try:
-            with open(src_path, "r", encoding="utf-8") as f:
-                content = f.read()
+            content = _read_source(src_path)
 
             clean_content = remove_comments(content)
 
-            with open(dest_path, "w", encoding="utf-8") as f:
+            with open(dest_path, "wb") as f:
                 f.write(clean_content)
         except Exception as e:
             logger.error(f"Error cleaning {src_path}: {e}")
@@ -389,6 +481,20 @@ def copy_clean_file(src_path, dest_path, cited_keys=None):
         shutil.copy2(src_path, dest_path)
 
 
+def _process_one(args):
+    """
+    Copy and clean a single file; runs in a worker process.
+
+    Returns an error message, or None if the file was copied.
+    """
+    src_path, dest_path, cited_keys = args
+    try:
+        copy_clean_file(src_path, dest_path, cited_keys)
+    except Exception as e:
+        return str(e)
+    return None
+
+
 def print_dependency_tree(tree, indent=""):
     """
     Print the dependency tree.
@@ -402,10 +508,10 @@ def print_dependency_tree(tree, indent=""):
     TEE = "├── "
 
     # Get the file name instead of the full path
-    name = os.path.basename(tree["name"])
+    name = os.path.basename(tree.name)
 
     # Add different markers based on the file type
-    if tree["type"] == "graphics":
+    if tree.type == "graphics":
         prefix = "🖼 "  # Graphics files use image emoji
     else:
         prefix = "📄 "  # TeX files use document emoji
@@ -414,8 +520,8 @@ def print_dependency_tree(tree, indent=""):
     logger.info(f"{indent}{prefix}{name}")
 
     # Process child nodes
-    for i, child in enumerate(tree["children"]):
-        is_last = i == len(tree["children"]) - 1
+    for i, child in enumerate(tree.children):
+        is_last = i == len(tree.children) - 1
         next_indent = indent + ("    " if is_last else "│   ")
         print_dependency_tree(child, next_indent)
 
@@ -433,6 +539,9 @@ def clean_latex_project(source_dir, output_dir, main_tex, verbose=False):
     source_dir = os.path.abspath(source_dir)
     output_dir = os.path.abspath(output_dir)
 
+    # Directory listings are cached per run; start from a fresh view of the tree
+    _dir_listing.cache_clear()
+
     logger.info(f"Analyzing LaTeX project starting from {main_tex}...")
 
     # Find all dependencies, graphics, and citations recursively from main.tex
@@ -487,54 +596,105 @@ def clean_latex_project(source_dir, output_dir, main_tex, verbose=False):
         "sig-alternate-05-2015.cls",
     ]
 
-    # Add style files that are commonly needed
-    for root, _, files in os.walk(source_dir):
-        for file in files:
-            if file.endswith(".sty") or file.endswith(".cls") or file.endswith(".bst"):
-                rel_path = os.path.relpath(os.path.join(root, file), source_dir)
-                if rel_path not in dependencies:
-                    dependencies.add(rel_path)
-                    if verbose:
-                        logger.info(f"Added style file: {rel_path}")
+    # Add style files that are commonly needed, found in a single walk
+    source_root = Path(source_dir)
+    style_suffixes = {".sty", ".cls", ".bst"}
+    style_files = {
+        str(path.relative_to(source_root))
+        for path in source_root.rglob("*")
+        if path.suffix in style_suffixes and path.is_file()
+    }
+    style_files -= dependencies
+    dependencies |= style_files
+    if verbose:
+        for rel_path in sorted(style_files):
+            logger.info(f"Added style file: {rel_path}")
 
-    # Copy TeX files and their dependencies
+    # Sort the dependencies that exist by how they are copied
+    tex_files, bib_files, other_files = [], [], []
     for file_path in dependencies:
-        src_path = os.path.join(source_dir, file_path)
-        dest_path = os.path.join(output_dir, file_path)
-
-        if os.path.exists(src_path):
-            try:
-                if file_path.endswith(".bib"):
-                    copy_clean_file(src_path, dest_path, cited_keys)
-                else:
-                    copy_clean_file(src_path, dest_path)
-                if verbose:
-                    logger.info(f"Copied: {file_path}")
-            except Exception as e:
-                logger.error(f"Error copying {file_path}: {e}")
-        else:
+        if not _path_exists(source_dir, file_path):
             logger.warning(f"Dependency not found: {file_path}")
+        elif file_path.endswith(".tex"):
+            tex_files.append(file_path)
+        elif file_path.endswith(".bib"):
+            bib_files.append(file_path)
+        else:
+            other_files.append(file_path)
 
-    # Copy graphics files
+    graphics_files = []
     for file_path in included_graphics:
-        src_path = os.path.join(source_dir, file_path)
-        dest_path = os.path.join(output_dir, file_path)
-
-        if os.path.exists(src_path):
-            try:
-                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-                shutil.copy2(src_path, dest_path)
-                if verbose:
-                    logger.info(f"Copied: {file_path}")
-            except Exception as e:
-                logger.error(f"Error copying {file_path}: {e}")
+        if _path_exists(source_dir, file_path):
+            graphics_files.append(file_path)
         else:
             logger.warning(f"Graphic not found: {file_path}")
 
+    # Create every destination directory once, up front
+    dest_dirs = {
+        os.path.dirname(os.path.join(output_dir, file_path))
+        for files in (tex_files, bib_files, other_files, graphics_files)
+        for file_path in files
+    }
+    for dest_dir in dest_dirs:
+        os.makedirs(dest_dir, exist_ok=True)
+
+    # The few (but large) BIB files are filtered here
+    for file_path in bib_files:
+        try:
+            filter_bib_file(
+                os.path.join(source_dir, file_path),
+                os.path.join(output_dir, file_path),
+                cited_keys,
+            )
+            if verbose:
+                logger.info(f"Copied: {file_path}")
+        except Exception as e:
+            logger.error(f"Error copying {file_path}: {e}")
+
+    # Other dependencies such as style files are copied as they are
+    for file_path in other_files:
+        try:
+            shutil.copy2(
+                os.path.join(source_dir, file_path), os.path.join(output_dir, file_path)
+            )
+            if verbose:
+                logger.info(f"Copied: {file_path}")
+        except Exception as e:
+            logger.error(f"Error copying {file_path}: {e}")
+
+    # Stripping comments from TeX files is independent per file, so it runs
+    # in worker processes
+    payloads = [
+        (
+            os.path.join(source_dir, file_path),
+            os.path.join(output_dir, file_path),
+            None,
+        )
+        for file_path in tex_files
+    ]
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        errors = executor.map(_process_one, payloads, chunksize=8)
+        for file_path, error in zip(tex_files, errors):
+            if error:
+                logger.error(f"Error copying {file_path}: {error}")
+            elif verbose:
+                logger.info(f"Copied: {file_path}")
+
+    # Copy graphics files
+    for file_path in graphics_files:
+        try:
+            shutil.copy2(
+                os.path.join(source_dir, file_path), os.path.join(output_dir, file_path)
+            )
+            if verbose:
+                logger.info(f"Copied: {file_path}")
+        except Exception as e:
+            logger.error(f"Error copying {file_path}: {e}")
+
     # Copy important auxiliary files
     for file in important_files:
         src_path = os.path.join(source_dir, file)
-        if os.path.exists(src_path):
+        if _path_exists(source_dir, file):
             dest_path = os.path.join(output_dir, file)
             try:
                 shutil.copy2(src_path, dest_path)
@@ -550,23 +710,31 @@ def find_main_tex_file(source_dir):
     """Try to automatically find the main TeX file in the source directory."""
     logger.info("Trying to automatically find the main TeX file...")
 
-    # Find possible main TeX files
-    tex_files = []
-    for root, _, files in os.walk(source_dir):
-        for file in files:
-            if file.endswith(".tex"):
-                tex_files.append(os.path.relpath(os.path.join(root, file), source_dir))
+    # Files named main.tex or after the directory are preferred
+    dir_name = os.path.basename(os.path.normpath(source_dir))
+    preferred_names = ("main.tex", f"{dir_name}.tex".lower())
 
-    # Check file content to find \documentclass command
+    # Check file content to find \documentclass command; it sits in the
+    # preamble, so only the start of each file needs to be read
     main_candidates = []
-    for tex_file in tex_files:
-        try:
-            with open(os.path.join(source_dir, tex_file), "r", encoding="utf-8") as f:
-                content = f.read()
-                if r"\documentclass" in content:
-                    main_candidates.append(tex_file)
-        except Exception:
-            continue
+    for root, _, files in os.walk(source_dir):
+        for file in files:
+            if not file.endswith(".tex"):
+                continue
+            tex_file = os.path.relpath(os.path.join(root, file), source_dir)
+            try:
+                with open(os.path.join(source_dir, tex_file), "rb") as f:
+                    content = f.read(8192)
+            except Exception:
+                continue
+            if rb"\documentclass" not in content:
+                continue
+
+            # A preferred candidate wins outright, stop walking the tree
+            if file.lower() in preferred_names:
+                logger.info(f"Selected main TeX file: {tex_file}")
+                return tex_file
+            main_candidates.append(tex_file)
 
     if not main_candidates:
         logger.error(
@@ -578,14 +746,6 @@ def find_main_tex_file(source_dir):
         logger.info(f"Found main TeX file: {main_candidates[0]}")
         return main_candidates[0]
 
-    # If there are multiple candidates, try to find a file named main.tex or the same as the directory
-    dir_name = os.path.basename(os.path.normpath(source_dir))
-    for candidate in main_candidates:
-        base_name = os.path.basename(candidate)
-        if base_name.lower() == "main.tex" or base_name.lower() == f"{dir_name}.tex":
-            logger.info(f"Selected main TeX file: {candidate}")
-            return candidate
-
     logger.warning(f"Multiple potential main TeX files found: {main_candidates}")
     logger.warning(f"Using the first one: {main_candidates[0]}")
     return main_candidates[0]